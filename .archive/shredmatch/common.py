@@ -0,0 +1,218 @@
+# shredmatch/common.py
+# Helpers shared by the shredmatch 1.x scripts.
+import os
+import re
+import sqlite3
+import argparse
+import yaml
+import logging
+import mmap
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Logging and database file configuration
+CONFIG_FILE = "config.yaml"
+FILE_EXTENSIONS = (".mp4", ".zip", ".jpg")
+SKIP_DIRS = {"__pycache__", "node_modules"}
+# Matched against the lower-cased basename
+PHOTO_PATTERN = re.compile(r"photo-(\d{12})-([a-f0-9-]{36})\.zip")
+UUID_PATTERN = re.compile(r"[A-Fa-f0-9]{8}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{12}")
+LOG_LINE_MARKER = b"starting reading "
+# Matched against the decoded line, so \w covers non-ASCII folder names as the old str regex did
+LOG_LINE_PATTERN = re.compile(r"starting reading ([A-Fa-f0-9-]{36}) .*(/import-[\w-]+)")
+INSERT_BATCH_SIZE = 10_000
+INSERT_MATCH_SQL = """
+INSERT OR IGNORE INTO shredmatch (
+    timestamp_inserted, shredded_timestamp, shredded_source_folder,
+    import_source_folder, shredlog_source_folder, shredded_UUID,
+    import_UUID, import_folder_name, import_folder_files,
+    matching_log_filename, shredded_files, wholename
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def load_config(config_file):
+    """Load configuration from a YAML file."""
+    try:
+        with open(config_file, "r") as file:
+            return yaml.load(file, Loader=SafeLoader)
+    except FileNotFoundError:
+        print(f"Configuration file {config_file} not found.")
+        exit(1)
+    except yaml.YAMLError as e:
+        print(f"Error reading configuration file: {e}")
+        exit(1)
+
+def setup_logging(log_file, log_format):
+    """Setup logging."""
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format=log_format,
+    )
+    logging.getLogger().addHandler(logging.StreamHandler())
+
+def parse_arguments():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="ShredMatch file and log matcher.")
+    parser.add_argument("--shredded_source", help="Path to the shredded source folder.")
+    parser.add_argument("--shredded_source-recursive", choices=["yes", "no"], help="Search shredded source recursively.")
+    parser.add_argument("--import_source", help="Path to the import source folder.")
+    parser.add_argument("--import_source-recursive", choices=["yes", "no"], help="Search import source recursively.")
+    parser.add_argument("--shred_log_source", help="Path to the shred logs folder.")
+    parser.add_argument("--destination", help="Path to the processing output.")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Path to configuration file.")
+    return parser.parse_args()
+
+def merge_config_with_args(args, config):
+    """Merge command-line arguments with config file, prioritizing arguments."""
+    merged = {
+        "shredded_source": args.shredded_source or config.get("shredded_source"),
+        "shredded_source_recursive": args.shredded_source_recursive or config.get("shredded_source-recursive"),
+        "import_source": args.import_source or config.get("import_source"),
+        "import_source_recursive": args.import_source_recursive or config.get("import_source-recursive"),
+        "shred_log_source": args.shred_log_source or config.get("shred_log_source"),
+        "destination": args.destination or config.get("destination"),
+        "shredmatch_logfile": config.get("shredmatch_logfile"),
+        "log_format": config.get("log_format"),
+        "shredmatch_db_file": config.get("shredmatch_db_file"),
+    }
+    for key, value in merged.items():
+        if not value:
+            print(f"Error: Missing required parameter {key}.")
+            exit(1)
+    return merged
+
+def create_database(db_file):
+    """Create the database if it does not exist, and make sure the UUID index is in place."""
+    is_new = not os.path.exists(db_file)
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    if is_new:
+        logging.info("Database not found. Creating database at %s.", db_file)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS shredmatch (
+        unique_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp_inserted TIMESTAMP NOT NULL,
+        shredded_timestamp TIMESTAMP,
+        shredded_source_folder TEXT,
+        import_source_folder TEXT,
+        shredlog_source_folder TEXT,
+        shredded_UUID TEXT,
+        import_UUID TEXT,
+        import_folder_name TEXT,
+        import_folder_files TEXT,
+        matching_log_filename TEXT,
+        shredded_files TEXT,
+        wholename TEXT
+    );
+    """)
+    # Re-runs insert with OR IGNORE, so one row per shredded UUID is enforced here.
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_shredmatch_uuid ON shredmatch(shredded_UUID)")
+    except sqlite3.IntegrityError as e:
+        logging.warning("Could not create unique UUID index, duplicate rows already exist: %s", e)
+    conn.commit()
+    conn.close()
+
+def connect_database(db_file):
+    """Open the database in autocommit mode so callers control transactions with BEGIN/COMMIT."""
+    return sqlite3.connect(db_file, isolation_level=None, cached_statements=256)
+
+def get_files_from_source(source, recursive):
+    """Get relevant files (.mp4, .zip, .jpg) from a folder."""
+    logging.info("Looking in shredded_source: %s", source)
+    files = []
+    if recursive == "yes":
+        for root, dirs, filenames in os.walk(source, followlinks=True):
+            # Prune hidden and cache directories before os.walk descends into them
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d not in SKIP_DIRS]
+            for file in filenames:
+                if file.lower().endswith(FILE_EXTENSIONS):
+                    files.append(os.path.join(root, file))
+    else:
+        for file in os.listdir(source):
+            if file.lower().endswith(FILE_EXTENSIONS):
+                files.append(os.path.join(source, file))
+    logging.info("Found %d qualifying files.", len(files))
+    return files
+
+def extract_uuid_and_date(filename):
+    """Extract UUID and timestamp from a photo file name."""
+    basename = os.path.basename(filename)
+    basename_lc = basename.lower()
+    if not basename_lc.startswith("photo-"):
+        return None, None
+    match = PHOTO_PATTERN.match(basename_lc)
+    if match:
+        raw_date = match.group(1)
+        # Slice the UUID from the original name so its case is preserved
+        uuid = basename[match.start(2):match.end(2)]
+        try:
+            timestamp = datetime(
+                int(raw_date[0:4]), int(raw_date[4:6]), int(raw_date[6:8]),
+                int(raw_date[8:10]), int(raw_date[10:12])
+            )
+            logging.debug("Extracted UUID: %s, Timestamp: %s from file: %s", uuid, timestamp, filename)
+            return uuid, timestamp
+        except ValueError:
+            logging.warning("Invalid date format in file: %s", filename)
+            return None, None
+    logging.warning("No UUID and date found in file: %s", filename)
+    return None, None
+
+def group_files_by_uuid(files, uuids):
+    """Group files by which of the given UUIDs appears in their path."""
+    by_uuid = {uuid: [] for uuid in uuids}
+    for file in files:
+        for uuid in dict.fromkeys(UUID_PATTERN.findall(file)):
+            if uuid in by_uuid:
+                by_uuid[uuid].append(file)
+    # UUIDs that are not in 8-4-4-4-12 form fall back to a substring scan
+    for uuid in uuids:
+        if not UUID_PATTERN.fullmatch(uuid):
+            by_uuid[uuid] = [f for f in files if uuid in f]
+    return by_uuid
+
+def _parse_log(log_path):
+    """Map every UUID read in a single log file to (log file, import folder, name)."""
+    matches = {}
+    log_file = os.path.basename(log_path)
+    with open(log_path, "rb") as log:
+        if os.fstat(log.fileno()).st_size == 0:
+            return matches
+        with mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Jump between literal markers with find() and only decode the lines they sit on
+            pos = mm.find(LOG_LINE_MARKER)
+            while pos != -1:
+                line_end = mm.find(b"\n", pos)
+                if line_end == -1:
+                    line_end = len(mm)
+                match = LOG_LINE_PATTERN.match(mm[pos:line_end].decode("utf-8", errors="replace"))
+                if match:
+                    uuid = match.group(1)
+                    if uuid not in matches:
+                        import_folder = os.path.basename(match.group(2))
+                        wholename = re.search(r"import-([\w-]+?)-", import_folder)
+                        name = wholename.group(1) if wholename else None
+                        matches[uuid] = (log_file, import_folder, name)
+                pos = mm.find(LOG_LINE_MARKER, pos + len(LOG_LINE_MARKER))
+    return matches
+
+def build_uuid_index(logs_path):
+    """Scan all log files once, in parallel, and index the UUIDs they read."""
+    log_paths = [os.path.join(logs_path, f) for f in os.listdir(logs_path)]
+    log_paths = [p for p in log_paths if os.path.isfile(p)]
+    logging.info("Found %d potential log files.", len(log_paths))
+    index = {}
+    with ProcessPoolExecutor() as executor:
+        # map() preserves input order, so the first log to mention a UUID wins
+        for partial in executor.map(_parse_log, log_paths, chunksize=8):
+            for uuid, match in partial.items():
+                index.setdefault(uuid, match)
+    logging.info("Indexed %d UUIDs from the logs.", len(index))
+    return index
@@ -6,6 +6,8 @@ import argparse
 import yaml
 from datetime import datetime, timedelta
 
+from shredmatch.common import get_files_from_source, extract_uuid_and_date
+
 
 def load_config(config_file):
     """Load configuration from a YAML file."""
@@ -45,36 +47,6 @@ def parse_arguments():
     return parser.parse_args()
 
 
-def get_files_from_source(source, recursive):
-    """Get relevant files (.mp4, .zip, .jpg) from the source folder."""
-    file_patterns = [r".*\.mp4$", r".*\.zip$", r".*\.jpg$"]
-    files = []
-    if recursive:
-        for root, _, filenames in os.walk(source):
-            for file in filenames:
-                if any(re.search(pattern, file, re.IGNORECASE) for pattern in file_patterns):
-                    files.append(file)
-    else:
-        for file in os.listdir(source):
-            if any(re.search(pattern, file, re.IGNORECASE) for pattern in file_patterns):
-                files.append(file)
-    return files
-
-
-def extract_uuid_and_date(filename):
-    """Extract UUID and timestamp from a photo file name."""
-    pattern = r"photo-(\d{12})-([A-Fa-f0-9-]{36})\.zip"
-    match = re.search(pattern, filename, re.IGNORECASE)
-    if match:
-        raw_date, uuid = match.groups()
-        try:
-            timestamp = datetime.strptime(raw_date, "%Y%m%d%H%M")
-            return uuid, timestamp
-        except ValueError:
-            return None, None
-    return None, None
-
-
 def find_related_files(source_files, uuid):
     """Find all files related to the given UUID."""
     return [f for f in source_files if re.search(uuid, f, re.IGNORECASE)]
@@ -158,27 +130,26 @@ def main():
     setup_logging(log_path, log_file)
 
     source = args.source
-    source_recursive = args.source_recursive.lower() == "yes"
+    source_recursive = args.source_recursive.lower()
     shredlogs = args.shredlogs
     destination = args.destination
 
     source_files = get_files_from_source(source, source_recursive)
     results = []
     for file in source_files:
-        if "photo-" in file.lower():
-            uuid, timestamp = extract_uuid_and_date(file)
-            if uuid and timestamp:
-                related_files = find_related_files(source_files, uuid)
-                log_files = find_corresponding_log(shredlogs, timestamp)
-                import_folder, name = extract_import_folder_and_name(shredlogs, uuid)
-                results.append({
-                    "photo_file": file,
-                    "related_files": related_files,
-                    "log_files": log_files,
-                    "timestamp": timestamp,
-                    "import_folder": import_folder,
-                    "name": name,
-                })
+        uuid, timestamp = extract_uuid_and_date(file)
+        if uuid and timestamp:
+            related_files = find_related_files(source_files, uuid)
+            log_files = find_corresponding_log(shredlogs, timestamp)
+            import_folder, name = extract_import_folder_and_name(shredlogs, uuid)
+            results.append({
+                "photo_file": file,
+                "related_files": related_files,
+                "log_files": log_files,
+                "timestamp": timestamp,
+                "import_folder": import_folder,
+                "name": name,
+            })
     display_results(results)
 
 
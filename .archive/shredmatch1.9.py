@@ -3,7 +3,9 @@
 
 import os
 import re
+import sys
 import argparse
+import functools
 import yaml
 from datetime import datetime, timedelta
 from collections import Counter
@@ -34,24 +36,26 @@ def parse_arguments():
 
 def get_files_from_source(source, recursive):
     """Get relevant files (.mp4, .zip, .jpg) from the source folder."""
-    file_patterns = [r".*\.mp4$", r".*\.zip$", r".*\.jpg$"]
+    extensions = (".mp4", ".zip", ".jpg")
     files = []
-    if recursive:
-        for root, _, filenames in os.walk(source):
-            for file in filenames:
-                if any(re.search(pattern, file, re.IGNORECASE) for pattern in file_patterns):
-                    files.append(file)
-    else:
-        for file in os.listdir(source):
-            if any(re.search(pattern, file, re.IGNORECASE) for pattern in file_patterns):
-                files.append(file)
+    pending = [source]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    files.append(entry.name)
     return files
 
 
 def extract_uuid_and_date(filename):
     """Extract UUID and timestamp from a photo file name."""
-    pattern = r"photo-(\d{12})-([A-Fa-f0-9-]{36})\.zip"
-    match = re.search(pattern, filename, re.IGNORECASE)
+    if not filename.lower().startswith("photo-"):
+        return None, None
+    pattern = r"photo-(\d{12})-([A-Fa-f0-9-]{36})\.zip\Z"
+    match = re.match(pattern, filename, re.IGNORECASE)
     if match:
         raw_date, uuid = match.groups()
         try:
@@ -64,34 +68,42 @@ def extract_uuid_and_date(filename):
 
 def find_related_files(source_files, uuid):
     """Find all files related to the given UUID."""
-    return [f for f in source_files if re.search(uuid, f, re.IGNORECASE)]
+    uuid = uuid.lower()
+    return [f for f in source_files if uuid in f.lower()]
 
 
-def find_corresponding_log(logs_path, timestamp):
-    """Find the corresponding log file based on the timestamp."""
-    log_pattern = r"com\.shredvideo\.ShredCentral (\d{4}-\d{2}-\d{2}) (\d{2}-\d{2})\.log"
-    potential_logs = []
+@functools.lru_cache(maxsize=None)
+def index_logs_by_date(logs_path):
+    """List the logs folder once and map each date to its first log file."""
+    log_pattern = re.compile(r"com\.shredvideo\.ShredCentral (\d{4})-(\d{2})-(\d{2}) (\d{2})-(\d{2})\.log", re.IGNORECASE)
+    logs_by_date = {}
     for log_file in os.listdir(logs_path):
-        match = re.search(log_pattern, log_file, re.IGNORECASE)
+        match = log_pattern.search(log_file)
         if match:
-            log_date, log_time = match.groups()
-            log_datetime = datetime.strptime(f"{log_date} {log_time.replace('-', ':')}", "%Y-%m-%d %H:%M")
-            potential_logs.append((log_datetime, log_file))
+            year, month, day, hour, minute = map(int, match.groups())
+            logs_by_date.setdefault(datetime(year, month, day, hour, minute).date(), log_file)
+    return logs_by_date
+
 
+def find_corresponding_log(logs_path, timestamp):
+    """Find the corresponding log file based on the timestamp."""
+    logs_by_date = index_logs_by_date(logs_path)
     result_logs = []
     for delta in [-2, -1, 0, +1]:
         target_date = timestamp + timedelta(days=delta)
-        for log_datetime, log_file in potential_logs:
-            if log_datetime.date() == target_date.date():
-                result_logs.append((delta, log_file))
-                break
+        log_file = logs_by_date.get(target_date.date())
+        if log_file:
+            result_logs.append((delta, log_file))
     return result_logs
 
 
-def search_customer_info_in_logs(uuid, log_files, logs_path):
-    """Search for UUID and extract customer information from logs."""
+def scan_logs_for_uuid(uuid, log_files, logs_path):
+    """Read the logs once for a UUID, returning its import folder, name and customer information."""
+    import_folder = None
+    name = None
     customer_info = None
-    log_pattern = rf"starting reading {uuid}.*"
+    import_pattern = r"starting reading " + re.escape(uuid) + r" .*(/import-[\w-]+)"
+    log_pattern = rf"starting reading {re.escape(uuid)}.*"
     customer_pattern = r"updating customer .*?, (\w+ \w+) (\S+@\S+)"
 
     for day_offset, log_file in log_files:
@@ -101,18 +113,27 @@ def search_customer_info_in_logs(uuid, log_files, logs_path):
 
         with open(log_path, "r") as log:
             for line in log:
-                if re.search(log_pattern, line, re.IGNORECASE):
+                if "starting reading " not in line:
+                    continue
+                if import_folder is None:
+                    match = re.search(import_pattern, line, re.IGNORECASE)
+                    if match:
+                        import_folder = os.path.basename(match.group(1))
+                        name_match = re.search(r"import-([\w-]+?)-", import_folder)
+                        name = name_match.group(1) if name_match else None
+                if customer_info is None and re.search(log_pattern, line, re.IGNORECASE):
                     match = re.search(customer_pattern, line, re.IGNORECASE)
                     if match:
-                        name, email = match.groups()
+                        proper_name, email = match.groups()
                         customer_info = {
-                            "proper_name": name,
+                            "proper_name": proper_name,
                             "email": email,
                             "log_file": log_file,
                             "day_offset": day_offset,
                         }
-                        return customer_info
-    return None
+                if import_folder is not None and customer_info is not None:
+                    return import_folder, name, customer_info
+    return import_folder, name, customer_info
 
 
 def display_results(results, day_offset_counts):
@@ -167,8 +188,7 @@ def main():
             if uuid and timestamp:
                 related_files = find_related_files(source_files, uuid)
                 log_files = find_corresponding_log(shredlogs, timestamp)
-                import_folder, name = search_uuid_in_logs(uuid, log_files, shredlogs)
-                customer_info = search_customer_info_in_logs(uuid, log_files, shredlogs)
+                import_folder, name, customer_info = scan_logs_for_uuid(uuid, log_files, shredlogs)
 
                 for offset, _ in log_files:
                     day_offset_counts[offset] += 1
@@ -57,13 +57,14 @@ def main():
     if not os.path.isdir(source):
         logging.error(f"Source path does not exist or is not a directory: {source}")
         return
-    if not os.path.exists(destination):
-        try:
-            os.makedirs(destination)
-            logging.info(f"Created destination directory: {destination}")
-        except Exception as e:
-            logging.error(f"Failed to create destination directory: {e}")
-            return
+    try:
+        os.makedirs(destination)
+        logging.info(f"Created destination directory: {destination}")
+    except FileExistsError:
+        pass
+    except Exception as e:
+        logging.error(f"Failed to create destination directory: {e}")
+        return
 
     # Find and move nested folders
     nested_folders = find_nested_folders(source)
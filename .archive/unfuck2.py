@@ -3,7 +3,10 @@ import os
 import shutil
 import argparse
 import logging
-import filecmp
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+COMPARE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 def initialize_logging(log_file):
     logging.basicConfig(
@@ -13,14 +16,53 @@ def initialize_logging(log_file):
     )
     logging.getLogger().addHandler(logging.StreamHandler())  # Print to console as well
 
+def build_manifest(folder):
+    """
+    List a folder once and map each entry name to (is_dir, size, mtime_ns).
+    """
+    manifest = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                manifest[entry.name] = (True, 0, 0)
+            else:
+                stat = entry.stat(follow_symlinks=False)
+                manifest[entry.name] = (False, stat.st_size, stat.st_mtime_ns)
+    return manifest
+
+def hash_file(path):
+    """
+    Hash a file's contents with blake2b, reading it in C without Python-level chunking.
+    """
+    with open(path, "rb", buffering=0) as file:
+        return hashlib.file_digest(file, "blake2b").digest()
+
+def contents_match(folder1, manifest1, folder2, manifest2, names):
+    """
+    Check that each named entry matches on both sides, settling everything metadata can decide before hashing any file.
+    """
+    unverified = []
+    for name in names:
+        entry1, entry2 = manifest1[name], manifest2[name]
+        if entry1 == entry2:  # Same type, size and mtime, like filecmp's shallow check
+            continue
+        if entry1[0] or entry2[0] or entry1[1] != entry2[1]:
+            return False
+        unverified.append(name)
+    # Hashed one pair at a time; the comparisons themselves already run in the COMPARE_WORKERS pool
+    return all(hash_file(os.path.join(folder1, name)) == hash_file(os.path.join(folder2, name)) for name in unverified)
+
 def is_clone(folder, subfolder):
     """
     Check if a subfolder is a clone of its parent folder by comparing contents.
     """
     try:
-        comparison = filecmp.dircmp(folder, subfolder)
+        manifest = build_manifest(folder)
+        sub_manifest = build_manifest(subfolder)
         # Check if files and subdirectories match exactly
-        return not comparison.left_only and not comparison.right_only and not comparison.diff_files
+        if manifest.keys() != sub_manifest.keys():
+            return False
+        return contents_match(folder, manifest, subfolder, sub_manifest, manifest)
     except Exception as e:
         logging.error(f"Error comparing {folder} and {subfolder}: {e}")
         return False
@@ -30,12 +72,25 @@ def find_cloned_nested_folders(source):
     Recursively find folders where a folder contains another folder with the same name and identical contents.
     """
     cloned_folders = []
-    for root, dirs, files in os.walk(source):
-        for dir_name in dirs:
-            parent_folder = os.path.join(root, dir_name)
-            nested_folder = os.path.join(parent_folder, dir_name)
-            if os.path.isdir(nested_folder) and is_clone(parent_folder, nested_folder):
-                cloned_folders.append(nested_folder)
+    cloned = set()
+    with ThreadPoolExecutor(max_workers=COMPARE_WORKERS) as executor:
+        for root, dirs, _ in os.walk(source, topdown=True):
+            # A clone is moved out whole, so don't descend into it looking for more
+            dirs[:] = [dir_name for dir_name in dirs if os.path.join(root, dir_name) not in cloned]
+
+            candidates = []
+            for dir_name in dirs:
+                parent_folder = os.path.join(root, dir_name)
+                nested_folder = os.path.join(parent_folder, dir_name)
+                if os.path.isdir(nested_folder):
+                    candidates.append((parent_folder, nested_folder))
+
+            # Comparisons only read, so a directory's candidates can overlap each other's I/O waits
+            results = executor.map(lambda candidate: is_clone(*candidate), candidates)
+            for (_, nested_folder), is_cloned in zip(candidates, results):
+                if is_cloned:
+                    cloned_folders.append(nested_folder)
+                    cloned.add(nested_folder)
     return cloned_folders
 
 def move_folder(folder, destination):
@@ -71,13 +126,14 @@ def main():
     if not os.path.isdir(source):
         logging.error(f"Source path does not exist or is not a directory: {source}")
         return
-    if not os.path.exists(destination):
-        try:
-            os.makedirs(destination)
-            logging.info(f"Created destination directory: {destination}")
-        except Exception as e:
-            logging.error(f"Failed to create destination directory: {e}")
-            return
+    try:
+        os.makedirs(destination)
+        logging.info(f"Created destination directory: {destination}")
+    except FileExistsError:
+        pass
+    except Exception as e:
+        logging.error(f"Failed to create destination directory: {e}")
+        return
 
     # Find and move cloned nested folders
     cloned_folders = find_cloned_nested_folders(source)
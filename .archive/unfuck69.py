@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 import os
 import shutil
-import filecmp
+import hashlib
 import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_WORKERS = 8
 
 def initialize_logging(log_file):
     logging.basicConfig(
@@ -17,10 +20,8 @@ def build_master_list(master_path):
     """
     Build a list of subfolders in the master directory.
     """
-    return [
-        folder for folder in os.listdir(master_path)
-        if os.path.isdir(os.path.join(master_path, folder))
-    ]
+    with os.scandir(master_path) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
 
 def compare_and_clean(master_path, target_path):
     """
@@ -35,8 +36,9 @@ def compare_and_clean(master_path, target_path):
     logging.info(f"Master list: {master_list}")
     logging.info(f"Target list: {target_list}")
 
+    master_names = set(master_list)
     for subfolder in target_list:
-        if subfolder in master_list:
+        if subfolder in master_names:
             master_subfolder = os.path.join(master_path, subfolder)
             target_subfolder = os.path.join(target_path, subfolder)
 
@@ -48,24 +50,71 @@ def compare_and_clean(master_path, target_path):
             else:
                 logging.info(f"Folders differ: {target_subfolder} not deleted.")
 
+def build_manifest(folder):
+    """
+    Walk a folder once and map each relative path to (is_dir, size, mtime_ns).
+    """
+    manifest = {}
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(folder, rel_dir)) as entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    manifest[rel_path] = (True, 0, 0)
+                    stack.append(rel_path)
+                else:
+                    stat = entry.stat(follow_symlinks=False)
+                    manifest[rel_path] = (False, stat.st_size, stat.st_mtime_ns)
+    return manifest
+
+def hash_file(path):
+    """
+    Hash a file's contents with blake2b, reading it in C without Python-level chunking.
+    """
+    with open(path, "rb", buffering=0) as file:
+        return hashlib.file_digest(file, "blake2b").digest()
+
+def contents_match(folder1, manifest1, folder2, manifest2, names):
+    """
+    Check that each named entry matches on both sides, settling everything metadata can decide before hashing any file.
+    """
+    unverified = []
+    for name in names:
+        entry1, entry2 = manifest1[name], manifest2[name]
+        if entry1 == entry2:  # Same type, size and mtime, like filecmp's shallow check
+            continue
+        if entry1[0] or entry2[0] or entry1[1] != entry2[1]:
+            return False
+        unverified.append(name)
+    if not unverified:
+        return True
+
+    def same_contents(name):
+        return hash_file(os.path.join(folder1, name)) == hash_file(os.path.join(folder2, name))
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        identical = all(executor.map(same_contents, unverified))
+        executor.shutdown(cancel_futures=True)  # No need to hash the rest after a mismatch
+    return identical
+
 def compare_folders(folder1, folder2):
     """
     Compare two folders to ensure all files in folder2 exist in folder1.
     """
-    comparison = filecmp.dircmp(folder1, folder2)
+    manifest1 = build_manifest(folder1)
+    manifest2 = build_manifest(folder2)
 
     # Ensure no files are unique to folder2
-    if comparison.right_only or comparison.diff_files:
-        logging.debug(f"Unique to {folder2}: {comparison.right_only}")
-        logging.debug(f"Different files: {comparison.diff_files}")
+    right_only = manifest2.keys() - manifest1.keys()
+    if right_only:
+        logging.debug(f"Unique to {folder2}: {sorted(right_only)}")
         return False
 
-    # Recursively check subdirectories
-    for subdir in comparison.common_dirs:
-        subfolder1 = os.path.join(folder1, subdir)
-        subfolder2 = os.path.join(folder2, subdir)
-        if not compare_folders(subfolder1, subfolder2):
-            return False
+    if not contents_match(folder1, manifest1, folder2, manifest2, manifest2):
+        logging.debug(f"Different files between {folder1} and {folder2}")
+        return False
 
     return True
 
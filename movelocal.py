@@ -1,6 +1,7 @@
 #!/spindles/shred/.venv/shredsync/bin/python3
 import os
 import sys
+import functools
 import logging
 import shutil
 import yaml
@@ -9,6 +10,7 @@ from datetime import datetime
 from time import time
 
 CONFIG_FILE = "config.yaml"
+FOLDER_PATTERN = re.compile(r"^(import-[a-zA-Z0-9_ -]+)-(\d{12})-([a-fA-F0-9-]{36})$")
 
 def load_config(config_file):
     with open(config_file, "r") as file:
@@ -28,32 +30,28 @@ def load_history(history_file):
     if not os.path.exists(history_file):
         return set()
     with open(history_file, "r") as file:
-        return set(line.strip() for line in file)
+        return set(file.read().splitlines())
 
-def update_history(history_file, folder):
+def update_history(history_log, folder):
     try:
-        with open(history_file, "a") as file:
-            file.write(f"{folder}\n")
+        history_log.write(f"{folder}\n")
+        history_log.flush()  # A moved folder is gone from the source, so keep the log current
         logging.info(f"Updated history log with folder: {folder}")
     except Exception as e:
         logging.error(f"Failed to update history log for folder {folder}: {e}")
         raise
 
-def validate_folder_name(folder_name):
-    pattern = r"^import-[a-zA-Z0-9_ -]+-\d{12}-[a-fA-F0-9-]{36}$"
-    return re.match(pattern, folder_name) is not None
+def parse_folder_name(folder_name):
+    return FOLDER_PATTERN.match(folder_name)
 
-def ensure_path_structure(local_path, folder):
-    pattern = r"^(import-[a-zA-Z0-9_ -]+)-(\d{12})-([a-fA-F0-9-]{36})$"
-    match = re.match(pattern, folder)
-    if not match:
-        raise ValueError(f"Folder name does not match the expected pattern: {folder}")
+@functools.lru_cache(maxsize=4096)
+def format_timestamp_parts(timestamp):
+    date = datetime.strptime(timestamp, "%Y%m%d%H%M")
+    return date.strftime("%Y"), date.strftime("%m-%B"), date.strftime("%d-%A")
 
+def ensure_path_structure(local_path, folder, match):
     full_name, timestamp, uuid = match.groups()
-    date = datetime.strptime(timestamp, "%Y%m%d%H%M")
-    year = date.strftime("%Y")
-    month = date.strftime("%m-%B")
-    day = date.strftime("%d-%A")
+    year, month, day = format_timestamp_parts(timestamp)
     name = full_name[len("import-"):]  # Strip "import-" prefix from the name
 
     destination = os.path.join(local_path, year, month, day, name, folder)
@@ -106,39 +104,40 @@ def main():
     logging.info(f"Starting ShredBackupSync script with {action_type} mode.")
 
     # Start processing folders
-    folders = [
-        folder for folder in os.listdir(remote_path)
-        if os.path.isdir(os.path.join(remote_path, folder))
-    ]
+    with os.scandir(remote_path) as entries:
+        folders = [entry.name for entry in entries if entry.is_dir()]
 
     total_folders = len(folders)
     logging.info(f"Total folders found: {total_folders}")
     start_time = time()
 
-    for i, folder in enumerate(folders, 1):
-        if folder in processed_folders:
-            logging.info(f"Skipping already processed folder: {folder}")
-            continue
-
-        if not validate_folder_name(folder):
-            logging.warning(f"Skipping invalid folder: {folder}")
-            continue
-
-        source_folder = os.path.join(remote_path, folder)
-        destination_folder = ensure_path_structure(local_path, folder)
-
-        logging.info(f"Processing folder {i}/{total_folders}: {folder}")
-        print(f"Processing folder {i}/{total_folders}: {folder}")
-
-        try:
-            if movelocal:
-                move_folder(source_folder, destination_folder)
-            else:
-                copy_folder(source_folder, destination_folder)
-            update_history(history_file, folder)
-        except Exception as e:
-            logging.error(f"Error processing folder {folder}: {e}")
-            continue
+    # One handle for the run instead of reopening the history file per folder
+    with open(history_file, "a") as history_log:
+        for i, folder in enumerate(folders, 1):
+            if folder in processed_folders:
+                logging.info(f"Skipping already processed folder: {folder}")
+                continue
+
+            match = parse_folder_name(folder)
+            if not match:
+                logging.warning(f"Skipping invalid folder: {folder}")
+                continue
+
+            source_folder = os.path.join(remote_path, folder)
+            destination_folder = ensure_path_structure(local_path, folder, match)
+
+            logging.info(f"Processing folder {i}/{total_folders}: {folder}")
+            print(f"Processing folder {i}/{total_folders}: {folder}")
+
+            try:
+                if movelocal:
+                    move_folder(source_folder, destination_folder)
+                else:
+                    copy_folder(source_folder, destination_folder)
+                update_history(history_log, folder)
+            except Exception as e:
+                logging.error(f"Error processing folder {folder}: {e}")
+                continue
 
     elapsed_time = time() - start_time
     logging.info(f"All operations completed in {elapsed_time:.2f} seconds.")
@@ -8,19 +8,44 @@ import yaml
 import argparse
 import sqlite3
 from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 import shutil
 import logging
+import functools
+import mmap
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 # Version: ShredMatch 2.7
 
+COPY_WORKERS = 8
+# Inode of every file found by find_files, taken from the scandir walk so copies can be ordered without a stat
+FILE_INODES = {}
+
+# ---- Patterns ----
+
+PHOTO_PATTERN = re.compile(r"photo-(\d{12})-([A-Fa-f0-9-]{36})\.zip\Z", re.IGNORECASE)
+LOG_NAME_PATTERN = re.compile(r"com\.shredvideo\.ShredCentral (\d{4}-\d{2}-\d{2}) (\d{2}-\d{2})\.log", re.IGNORECASE)
+UUID_PATTERN = re.compile(r"(?<![A-Fa-f0-9])[A-Fa-f0-9]{8}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{12}(?![A-Fa-f0-9])")
+IMPORT_NAME_PATTERN = re.compile(r"import-([\w-]+?)-")
+STARTING_READING_PATTERN = re.compile(r"starting reading ([A-Fa-f0-9-]{36}) .*(/import-[\w-]+)", re.IGNORECASE)
+CUSTOMER_PATTERN = re.compile(
+    r"uploaded customer packages customer \d+, created: .+, (\w+) (.+) ([\w\.\-]+@[\w\.\-]+) (https?://[\w\./\-]+)"
+)
+
 # ---- Helper Functions ----
 
 def load_config(config_file):
     """Load configuration from a YAML file."""
     try:
         with open(config_file, "r") as file:
-            return yaml.safe_load(file)
+            return yaml.load(file, Loader=SafeLoader)
     except FileNotFoundError:
         sys.exit(f"Configuration file not found: {config_file}")
     except yaml.YAMLError as e:
@@ -37,10 +62,9 @@ def flatten_config(config):
     return flat_config
 
 
-def parse_arguments(config):
-    """Parse command-line arguments based on the configuration."""
+def parse_arguments(flat_config):
+    """Parse command-line arguments based on the flattened configuration."""
     parser = argparse.ArgumentParser(description="ShredMatch 2.7 Script")
-    flat_config = flatten_config(config)
 
     for key, details in flat_config.items():
         parser.add_argument(
@@ -55,9 +79,8 @@ def parse_arguments(config):
     return args
 
 
-def merge_config_and_args(config, args):
-    """Merge command-line arguments into the configuration, with arguments taking precedence."""
-    flat_config = flatten_config(config)
+def merge_config_and_args(flat_config, args):
+    """Merge command-line arguments into the flattened configuration, with arguments taking precedence."""
     merged = {key: details["value"] for key, details in flat_config.items()}
 
     for key, value in args.items():
@@ -86,8 +109,8 @@ def setup_database(db_file, db_path):
         os.chmod(db_path, int("0755", 8))
 
         if not os.path.exists(db_full_path):
-            logging.info(f"Database not found at {db_full_path}. Creating a new one.")
-            conn = sqlite3.connect(db_full_path)
+            logging.info("Database not found at %s. Creating a new one.", db_full_path)
+            conn = connect_database(db_full_path)
             cursor = conn.cursor()
             cursor.execute("""
             CREATE TABLE IF NOT EXISTS s_matches (
@@ -106,59 +129,103 @@ def setup_database(db_file, db_path):
             conn.commit()
             conn.close()
         else:
-            logging.info(f"Database found at {db_full_path}. Validating tables.")
+            logging.info("Database found at %s. Validating tables.", db_full_path)
         return db_full_path
     except Exception as e:
-        logging.error(f"Error setting up database at {db_full_path}: {e}")
+        logging.error("Error setting up database at %s: %s", db_full_path, e)
         raise
 
 
-def find_files(base_path, recursive, file_patterns):
-    """Find files matching given patterns in base_path."""
+def connect_database(db_full_path):
+    """Open the database with the journal settings used for batched writes."""
+    conn = sqlite3.connect(db_full_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def record_matches(db_full_path, rows):
+    """Insert all matched rows into s_matches in a single transaction."""
+    if not rows:
+        return
+    conn = connect_database(db_full_path)
+    try:
+        with conn:
+            conn.executemany("""
+            INSERT INTO s_matches (
+                inserted_timestamp, shredded_timestamp, shredded_source, import_source,
+                shred_log_source, shredded_uuid, import_uuid, import_folder, log_filename
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        logging.info("Recorded %d matches in %s", len(rows), db_full_path)
+    finally:
+        conn.close()
+
+
+def find_files(base_path, recursive, extensions):
+    """Find files with one of the given extensions in base_path."""
     matching_files = []
-    if recursive.lower() == "yes":
-        for root, _, files in os.walk(base_path):
-            for file in files:
-                if any(re.search(pattern, file, re.IGNORECASE) for pattern in file_patterns):
-                    matching_files.append(os.path.join(root, file))
-    else:
-        for file in os.listdir(base_path):
-            if any(re.search(pattern, file, re.IGNORECASE) for pattern in file_patterns):
-                matching_files.append(os.path.join(base_path, file))
+    pending = [base_path]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive.lower() == "yes":
+                        pending.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    matching_files.append(entry.path)
+                    FILE_INODES[entry.path] = entry.inode()
     return matching_files
 
 
 def extract_uuid_and_date(filename):
     """Extract UUID and timestamp from a photo file name."""
-    pattern = r"photo-(\d{12})-([A-Fa-f0-9-]{36})\.zip"
-    match = re.search(pattern, filename, re.IGNORECASE)
+    basename = os.path.basename(filename)
+    if not basename.lower().startswith("photo-"):
+        return None, None
+    match = PHOTO_PATTERN.match(basename)
     if match:
         raw_date, uuid = match.groups()
         try:
-            timestamp = datetime.strptime(raw_date, "%Y%m%d%H%M")
+            timestamp = datetime(
+                int(raw_date[0:4]), int(raw_date[4:6]), int(raw_date[6:8]),
+                int(raw_date[8:10]), int(raw_date[10:12])
+            )
             return uuid, timestamp
         except ValueError:
-            logging.warning(f"Invalid date format in filename: {filename}")
+            logging.warning("Invalid date format in filename: %s", filename)
     return None, None
 
 
 def find_related_files(source_files, uuid):
     """Find all files related to the given UUID."""
-    return [f for f in source_files if re.search(uuid, f, re.IGNORECASE)]
-
-
-def format_date_to_path(timestamp):
-    """Generate a directory path from a timestamp."""
-    year = timestamp.strftime("%Y")
-    month = timestamp.strftime("%m-%B")
-    day = timestamp.strftime("%d-%A")
+    uuid = uuid.lower()
+    return [f for f in source_files if uuid in f.lower()]
+
+
+def index_files_by_uuid(source_files):
+    """Group files by every UUID that appears in their full path, keyed by the lower-cased UUID."""
+    files_by_uuid = defaultdict(list)
+    for file in source_files:
+        # Match the whole path like find_related_files, so a UUID held only by a parent folder still counts
+        for uuid in set(UUID_PATTERN.findall(file)):
+            files_by_uuid[uuid.lower()].append(file)
+    return files_by_uuid
+
+
+@functools.lru_cache(maxsize=None)
+def format_date_to_path(date):
+    """Generate a directory path from a date; photos shot on the same day share one result."""
+    year = date.strftime("%Y")
+    month = date.strftime("%m-%B")
+    day = date.strftime("%d-%A")
     return os.path.join(year, month, day)
 
 
 def format_file_description(filename, uuid):
     """Format the file description for renaming."""
-    pattern = rf"{uuid}-(.+?)\.(.+)$"
-    match = re.search(pattern, filename, re.IGNORECASE)
+    match = re.search(rf"{re.escape(uuid)}-(.+?)\.(.+)$", filename, re.IGNORECASE)
     if match:
         description, extension = match.groups()
         description = description.replace("_", " ").title()
@@ -172,82 +239,151 @@ def copy_files_to_destination(files, customer_details, timestamp, destination):
     last_name = customer_details.get("last_name", "Unknown").title()
     full_name = f"{first_name} {last_name}"
 
-    date_path = format_date_to_path(timestamp)
+    date_path = format_date_to_path(timestamp.date())
     base_path = os.path.join(destination, date_path, full_name)
 
     os.makedirs(base_path, exist_ok=True)
 
+    copies = []
+    used_filenames = set()
     for file in files:
         description, extension = format_file_description(file, customer_details["uuid"])
         if description:
             new_filename = f"{full_name} - {description}.{extension}"
-            dest_path = os.path.join(base_path, new_filename)
-            shutil.copy2(file, dest_path)
-            logging.info(f"Copied {file} to {dest_path}")
+            # Copies run concurrently, so two sources must never share a destination
+            suffix = 2
+            while new_filename in used_filenames:
+                new_filename = f"{full_name} - {description} ({suffix}).{extension}"
+                suffix += 1
+            if suffix > 2:
+                logging.warning("Duplicate destination name for %s, copying as %s", file, new_filename)
+            used_filenames.add(new_filename)
+            copies.append((file, f"{base_path}{os.sep}{new_filename}"))
         else:
-            logging.warning(f"Could not parse description for file: {file}")
-
-
-def find_corresponding_log(logs_path, timestamp, shred_log_prior, shred_log_after):
-    """Find log files within the specified date range."""
-    log_pattern = r"com\.shredvideo\.ShredCentral (\d{4}-\d{2}-\d{2}) (\d{2}-\d{2})\.log"
-    potential_logs = []
-    for log_file in os.listdir(logs_path):
-        match = re.search(log_pattern, log_file, re.IGNORECASE)
+            logging.warning("Could not parse description for file: %s", file)
+
+    # Copy in inode order so the source disk is read roughly sequentially
+    copies.sort(key=lambda copy: FILE_INODES.get(copy[0], 0))
+    sources = [source for source, _ in copies]
+    dest_paths = [dest_path for _, dest_path in copies]
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        for file, dest_path in zip(sources, executor.map(shutil.copy2, sources, dest_paths)):
+            logging.info("Copied %s to %s", file, dest_path)
+
+
+@functools.lru_cache(maxsize=None)
+def index_shred_logs_by_date(logs_path):
+    """Map each date to the first ShredCentral log listed for it in logs_path, once per run."""
+    logs_by_date = {}
+    with os.scandir(logs_path) as entries:
+        log_files = [entry.name for entry in entries if entry.is_file()]
+    for log_file in log_files:
+        match = LOG_NAME_PATTERN.search(log_file)
         if match:
             log_date, log_time = match.groups()
-            log_datetime = datetime.strptime(f"{log_date} {log_time.replace('-', ':')}", "%Y-%m-%d %H:%M")
-            potential_logs.append((log_datetime, log_file))
-
-    result_logs = []
-    date_range = [timestamp + timedelta(days=delta) for delta in range(-shred_log_prior, shred_log_after + 1)]
-    for target_date in date_range:
-        for log_datetime, log_file in potential_logs:
-            if log_datetime.date() == target_date.date():
-                result_logs.append(log_file)
-                break
-
-    return result_logs
+            try:
+                log_datetime = datetime(
+                    int(log_date[0:4]), int(log_date[5:7]), int(log_date[8:10]),
+                    int(log_time[0:2]), int(log_time[3:5])
+                )
+            except ValueError:
+                logging.warning("Invalid date in log file name: %s", log_file)
+                continue
+            logs_by_date.setdefault(log_datetime.date(), log_file)
+    return logs_by_date
 
 
-def search_uuid_in_logs(uuid, log_files, logs_path):
-    """Search for UUID in the specified log files."""
-    import_folder, name = None, None
-    pattern = rf"starting reading {uuid} .*(/import-[\w-]+)"
+def find_corresponding_log(logs_path, timestamp, shred_log_prior, shred_log_after):
+    """Find log files within the specified date range."""
+    logs_by_date = index_shred_logs_by_date(logs_path)
+    date_range = [(timestamp + timedelta(days=delta)).date() for delta in range(-shred_log_prior, shred_log_after + 1)]
+    return [logs_by_date[target_date] for target_date in date_range if target_date in logs_by_date]
+
+
+def iter_marked_lines(log_path, marker):
+    """Yield the decoded lines of a log file that contain the given literal marker."""
+    with open(log_path, "rb") as log:
+        if os.fstat(log.fileno()).st_size == 0:
+            return
+        with mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            marker = marker.encode()
+            pos = mm.find(marker)
+            while pos != -1:
+                line_start = mm.rfind(b"\n", 0, pos) + 1
+                line_end = mm.find(b"\n", pos)
+                if line_end == -1:
+                    line_end = len(mm)
+                yield mm[line_start:line_end].decode("utf-8", errors="replace")
+                pos = mm.find(marker, line_end)
+
+
+def scan_log_for_uuids(log_path, wanted):
+    """Return the import folder and name where each wanted UUID is first read in one log file."""
+    found = {}
+    for line in iter_marked_lines(log_path, "starting reading "):
+        match = STARTING_READING_PATTERN.search(line)
+        if not match:
+            continue
+        uuid = wanted.get(match.group(1).lower())
+        if uuid and uuid not in found:
+            import_folder = os.path.basename(match.group(2))
+            name_match = IMPORT_NAME_PATTERN.search(import_folder)
+            name = name_match.group(1) if name_match else None
+            found[uuid] = (import_folder, name)
+    return found
+
+
+def index_uuids_in_logs(uuids, log_files, logs_path):
+    """Scan each log file once, in parallel, and record, per log, where each of the given UUIDs was read."""
+    wanted = {uuid.lower(): uuid for uuid in uuids}
+    hits = {uuid: {} for uuid in uuids}
+    if not log_files:
+        return hits
+    log_paths = [os.path.join(logs_path, log_file) for log_file in log_files]
+    with ProcessPoolExecutor() as executor:
+        for log_file, found in zip(log_files, executor.map(scan_log_for_uuids, log_paths, repeat(wanted))):
+            for uuid, hit in found.items():
+                hits[uuid][log_file] = hit
+    return hits
+
+
+def search_uuid_in_logs(uuid, log_files, uuid_hits):
+    """Return the first of the given log files that read the UUID, with its import folder and name."""
     for log_file in log_files:
-        log_path = os.path.join(logs_path, log_file)
-        with open(log_path, "r") as log:
-            for line in log:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    import_folder = os.path.basename(match.group(1))
-                    name_match = re.search(r"import-([\w-]+?)-", import_folder)
-                    name = name_match.group(1) if name_match else None
-                    return log_file, import_folder, name
+        if log_file in uuid_hits[uuid]:
+            import_folder, name = uuid_hits[uuid][log_file]
+            return log_file, import_folder, name
     return None, None, None
 
 
+@functools.lru_cache(maxsize=64)
+def read_customer_uploads(log_path):
+    """Parse every customer upload line in a log file once, for all UUIDs that share the log."""
+    uploads = []
+    for line in iter_marked_lines(log_path, "uploaded customer packages"):
+        match = CUSTOMER_PATTERN.search(line)
+        if match:
+            first_name, full_last_name, email, url = match.groups()
+            uploads.append((first_name, full_last_name.strip(), email, url))
+    return tuple(uploads)
+
+
 def extract_customer_details(name, log_path):
     """Extract customer details from the log file based on the name."""
-    pattern = r"uploaded customer packages customer \d+, created: .+, (\w+) (.+) ([\w\.\-]+@[\w\.\-]+) (https?://[\w\./\-]+)"
+    name_cf = name.casefold()
     try:
-        with open(log_path, "r") as log_file:
-            for line in log_file:
-                match = re.search(pattern, line)
-                if match:
-                    first_name, full_last_name, email, url = match.groups()
-                    full_last_name = full_last_name.strip()
-                    if first_name.lower() in name.lower() and full_last_name.lower() in name.lower():
-                        return {
-                            "first_name": first_name,
-                            "last_name": full_last_name,
-                            "email": email,
-                            "url": url
-                        }
+        for first_name, full_last_name, email, url in read_customer_uploads(log_path):
+            if first_name.casefold() in name_cf and full_last_name.casefold() in name_cf:
+                return {
+                    "first_name": first_name,
+                    "last_name": full_last_name,
+                    "email": email,
+                    "url": url
+                }
     except FileNotFoundError:
-        logging.error(f"Log file not found: {log_path}")
+        logging.error("Log file not found: %s", log_path)
     except Exception as e:
-        logging.error(f"Error processing log file {log_path}: {e}")
+        logging.error("Error processing log file %s: %s", log_path, e)
     return None
 
 
@@ -257,9 +393,9 @@ def main():
     script_base_path = Path(__file__).resolve().parent
     config_file = script_base_path / "config2.yaml"
 
-    config = load_config(config_file)
-    args = parse_arguments(config)
-    script_options = merge_config_and_args(config, args)
+    flat_config = flatten_config(load_config(config_file))
+    args = parse_arguments(flat_config)
+    script_options = merge_config_and_args(flat_config, args)
 
     logpath = script_options["logpath"]
     logfile = script_options["logfile"]
@@ -276,7 +412,7 @@ def main():
     shredded_files = find_files(
         script_options["shredded_source"],
         script_options["shredded_source_recursive"],
-        [r".*\.zip$", r".*\.mp4$", r".*\.jpg$"]
+        (".zip", ".mp4", ".jpg")
     )
 
     valid_files = {}
@@ -287,24 +423,36 @@ def main():
                 valid_files[uuid] = {"timestamp": timestamp, "files": []}
             valid_files[uuid]["files"].append(file)
 
-    for uuid, data in valid_files.items():
-        timestamp = data["timestamp"]
-        files = find_related_files(shredded_files, uuid)
-        log_files = find_corresponding_log(
+    log_files_by_uuid = {
+        uuid: find_corresponding_log(
             script_options["shred_log_source"],
-            timestamp,
+            data["timestamp"],
             int(script_options["shred_log_prior"]),
             int(script_options["shred_log_after"])
         )
-        matching_log, import_folder, name = search_uuid_in_logs(uuid, log_files, script_options["shred_log_source"])
+        for uuid, data in valid_files.items()
+    }
+    # Read every candidate log once for all UUIDs instead of once per UUID
+    candidate_logs = list(dict.fromkeys(log for logs in log_files_by_uuid.values() for log in logs))
+    uuid_hits = index_uuids_in_logs(valid_files, candidate_logs, script_options["shred_log_source"])
+
+    files_by_uuid = index_files_by_uuid(shredded_files)
+    inserted_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    matches = []
+    for uuid, data in valid_files.items():
+        timestamp = data["timestamp"]
+        # Irregular UUIDs are not in the index; fall back to scanning for them
+        files = files_by_uuid.get(uuid.lower()) or find_related_files(shredded_files, uuid)
+        log_files = log_files_by_uuid[uuid]
+        matching_log, import_folder, name = search_uuid_in_logs(uuid, log_files, uuid_hits)
         customer_details = None
         if matching_log and name:
             customer_details = extract_customer_details(name, os.path.join(script_options["shred_log_source"], matching_log))
 
         if customer_details:
             customer_details["uuid"] = uuid
-            logging.info(f"UUID: {uuid}, Files: {files}, Log Files: [{matching_log}], "
-                         f"Import Folder: {import_folder}, Name: {name}, Customer Details: {customer_details}")
+            logging.info("UUID: %s, Files: %s, Log Files: [%s], Import Folder: %s, Name: %s, Customer Details: %s",
+                         uuid, files, matching_log, import_folder, name, customer_details)
 
             copy_files_to_destination(
                 files=files,
@@ -312,6 +460,19 @@ def main():
                 timestamp=timestamp,
                 destination=script_options["destination"]
             )
+            matches.append((
+                inserted_timestamp,
+                timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                script_options["shredded_source"],
+                os.path.join(script_options["import_source"], import_folder),
+                script_options["shred_log_source"],
+                uuid,
+                None,
+                import_folder,
+                matching_log
+            ))
+
+    record_matches(db_path, matches)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,507 @@
+# shredsync_common.py
+# Helpers shared by the shredsync scripts, which differ only in their command-line options.
+import os
+import sys
+import errno
+import stat
+import functools
+import contextlib
+import itertools
+import logging
+import logging.handlers
+import queue
+import atexit
+import shutil
+import yaml
+import dbm
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from time import time
+import re
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Write buffer for the history log, which is flushed per batch rather than reopened per folder
+HISTORY_BUFFER_SIZE = 1 << 16
+# Index entry holding the history log's size and mtime as of the last time the index matched it
+HISTORY_STATE_KEY = "\0log_state"
+# Destination directories already created during this run
+ENSURED_DIRS = set()
+FOLDER_PATTERN = re.compile(r"^(import-[a-zA-Z0-9_ -]+)-(\d{12})-([a-fA-F0-9-]{36})$")
+
+
+def load_config(config_file):
+    """
+    Load configuration from the YAML file.
+    """
+    try:
+        with open(config_file, "r") as file:
+            return yaml.load(file, Loader=SafeLoader)
+    except FileNotFoundError:
+        sys.exit(f"Configuration file not found: {config_file}")
+    except yaml.YAMLError as e:
+        sys.exit(f"Error reading configuration file: {e}")
+
+
+def initialize_logging(log_path, log_file, log_format):
+    """
+    Initialize logging.
+    """
+    os.makedirs(log_path, exist_ok=True)
+    log_file_path = os.path.join(log_path, log_file)
+    file_handler = logging.FileHandler(log_file_path)
+    file_handler.setFormatter(logging.Formatter(log_format))
+    console_handler = logging.StreamHandler()  # Log to console as well
+
+    # Workers only enqueue records; a listener thread does the file and console writes
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return log_file_path
+
+
+def list_remote_folders(remote_path):
+    """
+    List folder names in remote_path.
+    """
+    with os.scandir(remote_path) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
+
+
+def get_folder_age(folder_path, now):
+    """
+    Calculate the age of a folder in days, relative to now, based on its last modification time.
+    """
+    folder_mtime = os.path.getmtime(folder_path)
+    age_in_days = (now - folder_mtime) / (24 * 3600)
+    return age_in_days
+
+
+def delete_old_folders(folder_paths, days_threshold, dry_run=False, parallelism=1):
+    """
+    Delete every folder that exceeds the age threshold.
+    """
+    if not days_threshold:
+        return
+
+    # One reference time for the whole batch
+    now = time()
+
+    def delete_old_folder(folder_path):
+        try:
+            age_in_days = get_folder_age(folder_path, now)
+        except OSError as e:
+            logging.error(f"Failed to check age of folder {folder_path}: {e}")
+            return
+        if age_in_days > days_threshold:
+            if dry_run:
+                logging.info(f"DRY-RUN: Would delete folder {folder_path}, age: {age_in_days:.2f} days")
+            else:
+                try:
+                    shutil.rmtree(folder_path)
+                    logging.info(f"Deleted folder {folder_path}, age: {age_in_days:.2f} days")
+                except Exception as e:
+                    logging.error(f"Failed to delete folder {folder_path}: {e}")
+        else:
+            logging.info(f"Folder {folder_path} is {age_in_days:.2f} days old, below threshold {days_threshold} days")
+
+    # Each folder is a stat plus a tree removal on the remote mount, so overlap their round trips
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        list(executor.map(delete_old_folder, folder_paths))
+
+
+def detect_and_fix_nesting(destination_path, dry_run):
+    """
+    Detect and fix nested folders in the destination path.
+    """
+    logging.info(f"Checking for nested folders in {destination_path}...")
+    changes = []
+    # Walking bottom-up lists every directory before its parent, so the parent's
+    # nesting probe can reuse that listing instead of reading the directory again
+    walked_sub_dirs = {}
+
+    for root, dirs, _ in os.walk(destination_path, topdown=False):
+        walked_sub_dirs[root] = dirs
+        for dir_name in dirs:
+            dir_path = os.path.join(root, dir_name)
+            sub_dirs = walked_sub_dirs.pop(dir_path, None)
+            if sub_dirs is None:  # Symlinked directories are not walked into
+                # Two subdirectories are enough to rule out nesting, so stop reading there
+                with os.scandir(dir_path) as entries:
+                    sub_dirs = list(itertools.islice((entry.name for entry in entries if entry.is_dir()), 2))
+
+            # Check for nesting
+            if len(sub_dirs) == 1 and sub_dirs[0] == dir_name:
+                nested_path = os.path.join(dir_path, sub_dirs[0])
+                logging.warning(f"Nested folder detected: {nested_path}")
+
+                # Suggested fix: move contents of the nested folder to the parent folder
+                changes.append((nested_path, dir_path))
+
+                if dry_run:
+                    logging.info(f"DRY-RUN: Would fix nesting by moving contents of {nested_path} to {dir_path}")
+                else:
+                    # Move nested folder contents to the parent folder
+                    for item in os.listdir(nested_path):
+                        item_path = os.path.join(nested_path, item)
+                        target_path = os.path.join(dir_path, item)
+                        shutil.move(item_path, target_path)
+                        logging.info(f"Moved: {item_path} -> {target_path}")
+
+                    # Delete the now-empty nested folder; rmdir itself refuses a non-empty one
+                    try:
+                        os.rmdir(nested_path)
+                        logging.info(f"Deleted empty folder: {nested_path}")
+                    except OSError as e:
+                        logging.warning(f"Nested folder not empty, not deleted: {nested_path}: {e}")
+
+    if dry_run and changes:
+        logging.info("Detected nested folders that would be fixed:")
+        for nested_path, parent_path in changes:
+            logging.info(f"Nested: {nested_path} -> Parent: {parent_path}")
+    elif not changes:
+        logging.info("No nested folders detected.")
+
+
+def history_log_state(history_file):
+    """
+    Describe the history log by size and mtime, so the index can tell when it was changed behind its back.
+    """
+    try:
+        stat = os.stat(history_file)
+    except FileNotFoundError:
+        return "0:0"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def open_history(history_file):
+    """
+    Open the on-disk index of processed folders, rebuilding it from the history log
+    whenever the log has changed since the index last matched it.
+    """
+    index_file = f"{history_file}.db"
+    # Taken before reading the log, so a concurrent append leaves the index marked stale
+    log_state = history_log_state(history_file)
+    if dbm.whichdb(index_file):
+        history = dbm.open(index_file, "w")
+        if history.get(HISTORY_STATE_KEY) == log_state.encode():
+            return history
+        history.close()
+        logging.info(f"History log changed since the index was built, rebuilding {index_file}")
+
+    history = dbm.open(index_file, "n")
+    if os.path.exists(history_file):
+        with open(history_file, "r") as file:
+            for folder in file.read().splitlines():
+                if folder:
+                    history[folder] = "1"
+    history[HISTORY_STATE_KEY] = log_state
+    return history
+
+
+def update_history(history_log, history, folder):
+    """
+    Update the open history log and the index with the processed folder.
+    Returns the number of bytes appended to the log.
+    """
+    try:
+        entry = f"{folder}\n"
+        history_log.write(entry)
+        history[folder] = "1"
+        logging.info(f"Updated history log with folder: {folder}")
+        return len(entry.encode(history_log.encoding))
+    except Exception as e:
+        logging.error(f"Failed to update history log: {e}")
+        return 0
+
+
+def mark_history_current(history_file, history, appended_bytes):
+    """
+    Record the log's new state in the index, but only if our own appends account for all of its growth.
+    Anything else (movelocal or a manual edit) leaves the index stale, so the next run rebuilds it.
+    """
+    indexed_size = int(history[HISTORY_STATE_KEY].split(b":")[0])
+    stat = os.stat(history_file)
+    if stat.st_size != indexed_size + appended_bytes:
+        return False
+    history[HISTORY_STATE_KEY] = f"{stat.st_size}:{stat.st_mtime_ns}"
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def parse_folder_name(folder_name):
+    """
+    Match a folder name against the expected format once, for both validation and path building.
+    """
+    return FOLDER_PATTERN.match(folder_name)
+
+
+def validate_folder_name(folder_name):
+    """
+    Validate folder name against the expected format.
+    """
+    return parse_folder_name(folder_name) is not None
+
+
+@functools.lru_cache(maxsize=4096)
+def format_timestamp_parts(timestamp):
+    """
+    Format a folder timestamp into its year, month and day directory names.
+    """
+    date = datetime(
+        int(timestamp[0:4]), int(timestamp[4:6]), int(timestamp[6:8]),
+        int(timestamp[8:10]), int(timestamp[10:12])
+    )
+    return date.strftime("%Y"), date.strftime("%m-%B"), date.strftime("%d-%A")
+
+
+def ensure_path_structure(local_path, folder, dry_run=False):
+    """
+    Ensure destination path structure based on folder name.
+    """
+    match = parse_folder_name(folder)
+    if not match:
+        raise ValueError(f"Invalid folder name format: {folder}")
+
+    full_name, timestamp, uuid = match.groups()
+    year, month, day = format_timestamp_parts(timestamp)
+    sep = os.sep
+    destination = f"{local_path.rstrip(sep)}{sep}{year}{sep}{month}{sep}{day}{sep}{full_name[len('import-'):]}"
+    if not dry_run and destination not in ENSURED_DIRS:
+        os.makedirs(destination, exist_ok=True)
+        ENSURED_DIRS.add(destination)
+    logging.info(f"Destination structure ensured: {destination}")
+    return destination
+
+
+def move_folder(source_folder, destination_folder, dry_run=False):
+    """
+    Move the folder to the destination.
+    """
+    try:
+        if dry_run:
+            logging.info(f"DRY-RUN: Would move folder: {source_folder} -> {destination_folder}")
+        else:
+            shutil.move(source_folder, destination_folder)
+            logging.info(f"Moved folder: {source_folder} -> {destination_folder}")
+    except Exception as e:
+        logging.error(f"Failed to move folder: {e}")
+        raise
+
+
+def remove_old_files(source_folders, days_threshold):
+    """
+    Remove regular files older than the threshold, then any directories left empty, in one bottom-up walk.
+    """
+    # Same test as find -mtime +N: whole days of age, rounded down, must exceed N
+    cutoff = time() - (days_threshold + 1) * 24 * 3600
+    for source_folder in source_folders:
+        # Walking bottom-up means a directory is tested for emptiness after its old files are gone
+        for root, _, files in os.walk(source_folder, topdown=False):
+            for name in files:
+                file_path = os.path.join(root, name)
+                try:
+                    file_stat = os.lstat(file_path)
+                    if stat.S_ISREG(file_stat.st_mode) and file_stat.st_mtime <= cutoff:
+                        os.unlink(file_path)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.rmdir(root)
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST, errno.ENOENT):
+                    raise
+
+
+def rsync_folders(source_folders, destination_folder, rsync_options, days_threshold=None, dry_run=False):
+    """
+    Rsync one or more folders into a shared destination with a single rsync process,
+    and optionally remove old source files based on age.
+    """
+    try:
+        if dry_run:
+            for source_folder in source_folders:
+                logging.info(f"DRY-RUN: Would rsync folder: {source_folder} -> {destination_folder}")
+            return
+
+        command = ["rsync"] + rsync_options.split() + list(source_folders) + [destination_folder]
+        logging.info(f"Executing: {' '.join(command)}")
+
+        # Relay rsync's output in raw chunks rather than decoding it line by line
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+        while chunk := os.read(process.stdout.fileno(), 65536):
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        process.stdout.close()
+        process.wait()
+
+        if process.returncode == 0:
+            for source_folder in source_folders:
+                logging.info(f"Rsync completed: {source_folder} -> {destination_folder}")
+
+            if days_threshold:
+                for source_folder in source_folders:
+                    logging.info(f"Removing files older than {days_threshold} days from {source_folder}")
+                    logging.info(f"Removing empty directories from {source_folder}")
+                remove_old_files(source_folders, days_threshold)
+        else:
+            logging.error(f"Rsync failed with code {process.returncode}")
+            raise subprocess.CalledProcessError(process.returncode, command)
+    except Exception as e:
+        logging.error(f"Rsync failed: {e}")
+        raise
+
+
+def transfer_folders(action, source_folders, destination_folder, rsync_options, days_threshold=None, dry_run=False):
+    """
+    Transfer a batch of folders that share a destination with the configured action.
+    """
+    if action == "rsync":
+        rsync_folders(source_folders, destination_folder, rsync_options, days_threshold, dry_run)
+    elif action == "move":
+        for source_folder in source_folders:
+            move_folder(source_folder, destination_folder, dry_run)
+
+
+def set_global_umask(umask_value):
+    """
+    Set global umask for directory and file permissions.
+    """
+    try:
+        os.umask(int(umask_value, 8))
+        logging.info(f"Set umask to {umask_value}")
+    except ValueError as e:
+        logging.error(f"Invalid umask value: {umask_value} - {e}")
+        sys.exit(1)
+
+
+def get_config_or_exit(config, key, description):
+    """
+    Retrieve a configuration value or exit with an error.
+    """
+    value = config.get(key)
+    if value is None:
+        logging.error(f"Missing configuration: {description}")
+        sys.exit(f"Missing configuration: {description}")
+    return value
+
+
+def sync(config, action, dry_run=False, fix_nesting=False, delete_old=False):
+    """
+    Transfer every new import folder from remote_path into the dated local layout.
+    When delete_old is set, aged-out source folders are removed afterwards.
+    """
+    # Initialize logging
+    initialize_logging(
+        get_config_or_exit(config, "log_path", "log path"),
+        get_config_or_exit(config, "log_file_format", "log file format"),
+        get_config_or_exit(config, "log_format", "log format")
+    )
+
+    # Set umask
+    set_global_umask(get_config_or_exit(config, "umask", "umask value"))
+
+    # Load paths and settings
+    remote_path = get_config_or_exit(config, "remote_path", "remote path")
+    local_path = get_config_or_exit(config, "local_path", "local path")
+    rsync_options = get_config_or_exit(config, "rsync_options", "rsync options")
+    history_file = get_config_or_exit(config, "history_file", "history file")
+    days_threshold = int(config.get("days_threshold", 0)) if action == "rsync" else None
+    parallelism = int(config.get("parallelism", min(8, (os.cpu_count() or 1) * 2)))
+
+    # Check and fix nesting if requested
+    if fix_nesting:
+        logging.info("Running fix-nesting operation.")
+        detect_and_fix_nesting(local_path, dry_run)
+        logging.info("Fix-nesting operation complete. Exiting.")
+        sys.exit(0)
+
+    processed_folders = open_history(history_file)
+
+    # Proceed with the sync or move operation
+    logging.info(f"Starting script with action: {action}")
+    folders = list_remote_folders(remote_path)
+    logging.info(f"Total folders found: {len(folders)}")
+
+    start_time = time()
+
+    deletion_candidates = []
+    # rsync accepts many sources per destination, so folders sharing a destination
+    # directory go through one rsync process; moves stay one folder per batch
+    batches = {}
+    remote_root = remote_path.rstrip(os.sep)
+    for i, folder in enumerate(folders, 1):
+        folder_path = f"{remote_root}{os.sep}{folder}"
+
+        # Skip transfer/copy for already processed folders, but check for deletion if enabled
+        if folder in processed_folders:
+            logging.info(f"Skipping transfer/copy for already processed folder: {folder}")
+            if delete_old:
+                deletion_candidates.append(folder_path)
+            continue
+
+        # Validate folder name
+        if not validate_folder_name(folder):
+            logging.warning(f"Invalid folder name skipped: {folder}")
+            continue
+
+        destination_folder = ensure_path_structure(local_path, folder, dry_run)
+
+        logging.info(f"Processing folder {i}/{len(folders)}: {folder}")
+        batch_key = destination_folder if action == "rsync" else folder_path
+        batches.setdefault(batch_key, (destination_folder, []))[1].append((folder, folder_path))
+
+    # The history log stays open for the run and is flushed once per completed batch
+    history_log = contextlib.nullcontext() if dry_run else open(history_file, "a", buffering=HISTORY_BUFFER_SIZE)
+    appended_bytes = 0
+
+    # Transfers run in a bounded pool; history and deletion are handled as each one completes
+    with history_log, ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = {
+            executor.submit(
+                transfer_folders, action, [folder_path for _, folder_path in batch], destination_folder,
+                rsync_options, days_threshold, dry_run
+            ): batch
+            for destination_folder, batch in batches.values()
+        }
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                for folder, _ in futures[future]:
+                    logging.error(f"Error processing folder {folder}: {e}")
+                continue
+
+            for folder, folder_path in futures[future]:
+                # Update history only if the folder was successfully processed
+                if not dry_run:
+                    appended_bytes += update_history(history_log, processed_folders, folder)
+
+                # Check for deletion after processing
+                if delete_old:
+                    deletion_candidates.append(folder_path)
+
+            if not dry_run:
+                history_log.flush()
+
+        if not dry_run:
+            os.fsync(history_log.fileno())
+            if not mark_history_current(history_file, processed_folders, appended_bytes):
+                logging.info("History log was also changed by another writer; the index will be rebuilt next run")
+
+    processed_folders.close()
+
+    # Remove all aged-out source folders in one pass once transfers are done
+    delete_old_folders(deletion_candidates, days_threshold, dry_run, parallelism)
+
+    elapsed_time = time() - start_time
+    logging.info(f"All operations completed in {elapsed_time:.2f} seconds.")